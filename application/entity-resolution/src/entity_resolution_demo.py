@@ -4,31 +4,110 @@ Entity resolution demo using Splink library with fake_1000 dataset.
 This script demonstrates the full pipeline: data loading, model training, and clustering.
 """
 
-import pandas as pd
+import argparse
+import math
+import os
+import duckdb
+import jellyfish
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 import splink.comparison_library as cl
 from splink import DuckDBAPI, Linker, SettingsCreator, block_on, splink_datasets
 
-def load_demo_data():
-    """Load the fake_1000 demo dataset."""
+# DuckDB tuning - use every core by default so salted/blocked joins parallelise
+DUCKDB_CONFIG = {
+    'threads': int(os.getenv('DUCKDB_THREADS', os.cpu_count() or 1)),
+    'memory_limit': os.getenv('DUCKDB_MEMORY_LIMIT', '8GB'),
+    'temp_directory': os.getenv('DUCKDB_TEMP_DIRECTORY', '/tmp/duckdb'),
+}
+
+# Name of the DuckDB view over the input records
+INPUT_TABLE_NAME = "input_records"
+
+# Input records plus precomputed phonetic columns (generated, not tracked)
+ENRICHED_DATA_PATH = Path("data/fake_1000_enriched.parquet")
+
+# Parquet output is re-read on every run; zstd gives smaller files
+# that decompress quickly
+PARQUET_WRITE_OPTIONS = {
+    'compression': 'zstd',
+    'compression_level': 3,
+    'row_group_size': 50000,
+}
+
+# Trained model is cached here so scheduled runs can skip EM training
+MODEL_PATH = Path("data/splink_model.json")
+
+# One salting partition per DuckDB thread; Splink requires more than one
+SALTING_PARTITIONS = max(DUCKDB_CONFIG['threads'], 2)
+
+def create_duckdb_connection():
+    """Create a DuckDB connection tuned for Splink workloads."""
+    con = duckdb.connect(":memory:")
+    con.execute(f"PRAGMA threads={DUCKDB_CONFIG['threads']}")
+    con.execute(f"PRAGMA memory_limit='{DUCKDB_CONFIG['memory_limit']}'")
+    con.execute(f"PRAGMA temp_directory='{DUCKDB_CONFIG['temp_directory']}'")
+    return con
+
+def add_phonetic_columns(tbl):
+    """Append Metaphone encodings of first_name and surname to an Arrow table.
+    
+    Encoding once per record lets blocking use a cheap exact-match join on
+    the codes instead of computing phonetic similarity per candidate pair.
+    """
+    for column in ["first_name", "surname"]:
+        encoded = [
+            jellyfish.metaphone(value) if value else None
+            for value in tbl.column(column).to_pylist()
+        ]
+        tbl = tbl.append_column(f"{column}_metaphone", pa.array(encoded, type=pa.string()))
+    return tbl
+
+def load_demo_data(con):
+    """Expose the fake_1000 demo dataset to DuckDB as a view over Parquet.
+    
+    DuckDB reads column chunks straight from the file on demand, so the
+    records are never materialised in Python. Returns the view name.
+    """
     print("Loading demo dataset...")
     
     # Check if we have a local copy
     data_path = Path("data/fake_1000.parquet")
     if data_path.exists():
         print(f"Loading from local file: {data_path}")
-        df = pd.read_parquet(data_path)
     else:
         print("Loading from splink_datasets...")
         df = splink_datasets.fake_1000
         
         # Save for future use
         data_path.parent.mkdir(exist_ok=True)
-        df.to_parquet(data_path)
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            data_path,
+            **PARQUET_WRITE_OPTIONS
+        )
         print(f"Saved to: {data_path}")
     
-    print(f"Loaded {len(df)} records with columns: {df.columns.tolist()}")
-    return df
+    # Phonetic encodings are computed once into a separate file, leaving
+    # the input untouched; rebuilt whenever the input is newer
+    if (not ENRICHED_DATA_PATH.exists()
+            or ENRICHED_DATA_PATH.stat().st_mtime < data_path.stat().st_mtime):
+        print(f"Adding phonetic columns: {ENRICHED_DATA_PATH}")
+        pq.write_table(
+            add_phonetic_columns(pq.read_table(data_path)),
+            ENRICHED_DATA_PATH,
+            **PARQUET_WRITE_OPTIONS
+        )
+    
+    con.execute(f"""
+        CREATE OR REPLACE VIEW {INPUT_TABLE_NAME} AS
+        SELECT * FROM read_parquet('{ENRICHED_DATA_PATH.resolve().as_posix()}')
+    """)
+    
+    metadata = pq.read_metadata(ENRICHED_DATA_PATH)
+    print(f"Loaded {metadata.num_rows} records with columns: {metadata.schema.names}")
+    return INPUT_TABLE_NAME
 
 def create_splink_settings():
     """Create Splink settings configuration for entity resolution."""
@@ -62,15 +141,20 @@ def create_splink_settings():
             cl.EmailComparison("email"),
         ],
         
-        # Blocking rules to reduce comparisons
+        # Blocking rules to reduce comparisons - salted so large blocks
+        # (e.g. common first names) are split across DuckDB threads
         blocking_rules_to_generate_predictions=[
-            block_on("first_name", "surname"),  # Same first and last name
-            block_on("surname", "dob"),  # Same surname and DOB
-            block_on("email"),  # Same email
-            block_on("first_name", "city"),  # Same first name and city
+            block_on("first_name", "surname", salting_partitions=SALTING_PARTITIONS),  # Same first and last name
+            block_on("surname", "dob", salting_partitions=SALTING_PARTITIONS),  # Same surname and DOB
+            block_on("email", salting_partitions=SALTING_PARTITIONS),  # Same email
+            block_on("first_name", "city", salting_partitions=SALTING_PARTITIONS),  # Same first name and city
+            block_on("first_name_metaphone", "surname_metaphone",
+                     salting_partitions=SALTING_PARTITIONS),  # Names that sound alike
         ],
         
-        retain_intermediate_calculation_columns=True,
+        # Per-level gamma/bf/tf columns are only needed for debugging charts,
+        # which build their own linker (see create_debug_linker)
+        retain_intermediate_calculation_columns=False,
     )
     
     return settings
@@ -117,21 +201,59 @@ def run_predictions(linker):
         threshold_match_weight=-10  # Lower threshold to see more potential matches
     )
     
-    # Convert to pandas for inspection
-    predictions_df = pairwise_predictions.as_pandas_dataframe()
-    print(f"Generated {len(predictions_df)} pairwise comparisons")
+    # Summarise in SQL rather than pulling every pair into pandas
+    counts = linker.misc.query_sql(
+        f"""
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE match_probability > 0.9) AS high_confidence
+        FROM {pairwise_predictions.physical_name}
+        """,
+        output_type="pandas",
+    ).iloc[0]
+    print(f"Generated {counts['total']} pairwise comparisons")
     
     # Show sample of high-confidence matches
-    high_confidence = predictions_df[predictions_df['match_probability'] > 0.9]
-    print(f"Found {len(high_confidence)} high-confidence matches (>90% probability)")
+    print(f"Found {counts['high_confidence']} high-confidence matches (>90% probability)")
     
-    if len(high_confidence) > 0:
+    if counts['high_confidence'] > 0:
         print("\nSample high-confidence matches:")
-        sample = high_confidence.head(3)[['unique_id_l', 'unique_id_r', 'match_probability']]
+        sample = linker.misc.query_sql(
+            f"""
+            SELECT unique_id_l, unique_id_r, match_probability
+            FROM {pairwise_predictions.physical_name}
+            WHERE match_probability > 0.9
+            LIMIT 3
+            """,
+            output_type="pandas",
+        )
         print(sample)
     
     return pairwise_predictions
 
+def connected_components(node_ids, edges):
+    """Label each node with the smallest node id in its connected component.
+    
+    Uses union-find, keeping the smaller id as the root so labels match
+    the cluster_id Splink assigns.
+    """
+    parent = {node: node for node in node_ids}
+    
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]  # Path halving
+            node = parent[node]
+        return node
+    
+    for left, right in edges:
+        root_left, root_right = find(left), find(right)
+        if root_left != root_right:
+            if root_right < root_left:
+                root_left, root_right = root_right, root_left
+            parent[root_right] = root_left
+    
+    return {node: find(node) for node in node_ids}
+
 def create_clusters(linker, pairwise_predictions):
     """Create entity clusters from pairwise predictions."""
     
@@ -139,14 +261,38 @@ def create_clusters(linker, pairwise_predictions):
     
     # Cluster at different thresholds
     thresholds = [0.95, 0.90, 0.80]
+    lowest_threshold = min(thresholds)
+    
+    # Run Splink's clustering once, at the lowest threshold. Clusters at a
+    # higher threshold only split these, so they are derived in memory from
+    # the subset of edges that clear the higher threshold.
+    clusters = linker.clustering.cluster_pairwise_predictions_at_threshold(
+        pairwise_predictions, 
+        threshold_match_probability=lowest_threshold
+    )
+    lowest_clusters_df = clusters.as_pandas_dataframe()
+    
+    edges_df = linker.misc.query_sql(
+        f"""
+        SELECT unique_id_l, unique_id_r, match_probability
+        FROM {pairwise_predictions.physical_name}
+        WHERE match_probability >= {lowest_threshold}
+        """,
+        output_type="pandas",
+    )
     
     for threshold in thresholds:
-        clusters = linker.clustering.cluster_pairwise_predictions_at_threshold(
-            pairwise_predictions, 
-            threshold_match_probability=threshold
-        )
-        
-        clusters_df = clusters.as_pandas_dataframe()
+        if threshold == lowest_threshold:
+            clusters_df = lowest_clusters_df
+        else:
+            edges = edges_df[edges_df['match_probability'] >= threshold]
+            labels = connected_components(
+                lowest_clusters_df['unique_id'],
+                zip(edges['unique_id_l'], edges['unique_id_r'])
+            )
+            clusters_df = lowest_clusters_df.assign(
+                cluster_id=lowest_clusters_df['unique_id'].map(labels)
+            )
         
         # Count clusters
         cluster_counts = clusters_df.groupby('cluster_id').size()
@@ -164,7 +310,32 @@ def create_clusters(linker, pairwise_predictions):
     
     return clusters_df
 
-def generate_reports(linker):
+def create_debug_linker(linker, con, table_name):
+    """Rebuild a trained linker with intermediate calculation columns retained.
+    
+    Charts such as the waterfall need the per-level gamma/bf/tf columns,
+    which production settings don't keep.
+    """
+    model = linker.misc.save_model_to_json()
+    model.pop("linker_uid", None)  # Keep its cache tables separate
+    model["retain_intermediate_calculation_columns"] = True
+    model["retain_matching_columns"] = True
+    debug_linker = Linker(table_name, model, DuckDBAPI(connection=con))
+    
+    # A new linker has none of the trained linker's term frequency tables,
+    # and would silently score without TF adjustments
+    tf_columns = {
+        level["tf_adjustment_column"]
+        for comparison in model["comparisons"]
+        for level in comparison["comparison_levels"]
+        if level.get("tf_adjustment_column")
+    }
+    for column in sorted(tf_columns):
+        debug_linker.table_management.compute_tf_table(column)
+    
+    return debug_linker
+
+def generate_reports(linker, pairwise_predictions, con, table_name):
     """Generate diagnostic reports and visualizations."""
     
     print("\n=== Generating Reports ===")
@@ -182,35 +353,65 @@ def generate_reports(linker):
     
     # 2. Waterfall chart (shows how match weights accumulate)
     print("Generating waterfall chart...")
-    # Get sample pairs for waterfall visualization
-    waterfall_chart = linker.visualisations.waterfall_chart(
-        linker.inference.predict(threshold_match_weight=0).as_record_dict(limit=1)
-    )
-    waterfall_path = reports_dir / "waterfall_chart.html"
-    waterfall_chart.to_html(waterfall_path)
-    print(f"  Saved to: {waterfall_path}")
+    # Production predictions don't retain intermediate columns, so re-score
+    # just one sample pair from the existing predictions with a debug linker
+    sample_pairs = pairwise_predictions.as_record_dict(limit=1)
+    if not sample_pairs:
+        print("  Skipped: no pairwise predictions to chart")
+    else:
+        sample_pair = sample_pairs[0]
+        debug_linker = create_debug_linker(linker, con, table_name)
+        records = con.execute(
+            f"""
+            SELECT * FROM {table_name}
+            WHERE unique_id IN (?, ?)
+            ORDER BY unique_id = ?
+            """,
+            [sample_pair['unique_id_l'], sample_pair['unique_id_r'], sample_pair['unique_id_r']],
+        ).df().to_dict("records")
+        
+        rescored = debug_linker.inference.compare_two_records(*records).as_record_dict()
+        if not math.isclose(rescored[0]["match_weight"], sample_pair["match_weight"], abs_tol=1e-6):
+            print(f"  Warning: re-scored match weight {rescored[0]['match_weight']:.4f} "
+                  f"differs from predicted {sample_pair['match_weight']:.4f}")
+        waterfall_chart = debug_linker.visualisations.waterfall_chart(rescored)
+        waterfall_path = reports_dir / "waterfall_chart.html"
+        waterfall_chart.to_html(waterfall_path)
+        print(f"  Saved to: {waterfall_path}")
     
     print("\nReports generated! Open HTML files in browser to view.")
 
-def main():
+def main(retrain=False):
     """Main pipeline for entity resolution."""
     
     print("="*60)
     print("Entity Resolution Demo with Splink")
     print("="*60)
     
-    # Load data
-    df = load_demo_data()
+    con = create_duckdb_connection()
     
-    # Create settings
-    settings = create_splink_settings()
+    # Load data
+    table_name = load_demo_data(con)
     
     # Initialize linker with DuckDB backend
     print("\nInitializing Splink linker with DuckDB backend...")
-    linker = Linker(df, settings, DuckDBAPI())
     
-    # Train model
-    train_model(linker)
+    if MODEL_PATH.exists() and not retrain:
+        # Reuse the previously trained model
+        print(f"Loading trained model from: {MODEL_PATH}")
+        linker = Linker(table_name, str(MODEL_PATH), DuckDBAPI(connection=con))
+    else:
+        # Create settings
+        settings = create_splink_settings()
+        linker = Linker(table_name, settings, DuckDBAPI(connection=con))
+        
+        # Train model
+        train_model(linker)
+        
+        # Save the trained model for future runs
+        MODEL_PATH.parent.mkdir(exist_ok=True)
+        linker.misc.save_model_to_json(str(MODEL_PATH), overwrite=True)
+        print(f"Saved trained model to: {MODEL_PATH}")
     
     # Generate predictions
     pairwise_predictions = run_predictions(linker)
@@ -219,7 +420,7 @@ def main():
     clusters_df = create_clusters(linker, pairwise_predictions)
     
     # Generate reports
-    generate_reports(linker)
+    generate_reports(linker, pairwise_predictions, con, table_name)
     
     print("\n" + "="*60)
     print("Entity resolution pipeline complete!")
@@ -229,4 +430,9 @@ def main():
     return linker, clusters_df
 
 if __name__ == "__main__":
-    linker, clusters = main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--retrain", action="store_true",
+                        help=f"Retrain the model even if {MODEL_PATH} exists")
+    args = parser.parse_args()
+    
+    linker, clusters = main(retrain=args.retrain)
\ No newline at end of file
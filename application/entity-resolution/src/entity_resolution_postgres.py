@@ -21,6 +21,10 @@ DB_CONFIG = {
     'password': os.getenv('POSTGRES_PASSWORD', 'dataplatform')
 }
 
+# Salting partitions for prediction blocking rules, roughly one per core;
+# Splink requires more than one
+SALTING_PARTITIONS = max(int(os.getenv('SPLINK_SALTING_PARTITIONS', os.cpu_count() or 1)), 2)
+
 def get_postgres_connection_string():
     """Create PostgreSQL connection string."""
     return f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
@@ -32,9 +36,9 @@ def load_data_to_postgres():
     # Load local data
     data_path = Path("data/fake_1000.parquet")
     if not data_path.exists():
-        print("Demo data not found. Running explore script first...")
-        from explore_demo_data import explore_demo_datasets
-        df, _ = explore_demo_datasets()
+        print("Demo data not found. Downloading fake_1000...")
+        from explore_demo_data import load_fake_1000
+        df = load_fake_1000()
     else:
         df = pd.read_parquet(data_path)
     
@@ -76,13 +80,14 @@ def create_splink_settings_postgres():
         ],
         
         blocking_rules_to_generate_predictions=[
-            block_on("first_name", "surname"),
-            block_on("surname", "dob"),
-            block_on("email"),
-            block_on("first_name", "city"),
+            block_on("first_name", "surname", salting_partitions=SALTING_PARTITIONS),
+            block_on("surname", "dob", salting_partitions=SALTING_PARTITIONS),
+            block_on("email", salting_partitions=SALTING_PARTITIONS),
+            block_on("first_name", "city", salting_partitions=SALTING_PARTITIONS),
         ],
         
-        retain_intermediate_calculation_columns=True,
+        # Per-level gamma/bf/tf columns are only needed for debugging charts
+        retain_intermediate_calculation_columns=False,
     )
     
     return settings
@@ -120,12 +125,18 @@ def run_predictions_postgres(linker):
         threshold_match_weight=-10
     )
     
-    # Convert to pandas for analysis
-    predictions_df = pairwise_predictions.as_pandas_dataframe()
-    print(f"Generated {len(predictions_df)} pairwise comparisons")
-    
-    high_confidence = predictions_df[predictions_df['match_probability'] > 0.9]
-    print(f"Found {len(high_confidence)} high-confidence matches (>90% probability)")
+    # Summarise in SQL rather than pulling every pair into pandas
+    counts = linker.misc.query_sql(
+        f"""
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE match_probability > 0.9) AS high_confidence
+        FROM {pairwise_predictions.physical_name}
+        """,
+        output_type="pandas",
+    ).iloc[0]
+    print(f"Generated {counts['total']} pairwise comparisons")
+    print(f"Found {counts['high_confidence']} high-confidence matches (>90% probability)")
     
     return pairwise_predictions
 
@@ -6,19 +6,36 @@ Explore and save Splink demo dataset for entity resolution testing.
 from splink import splink_datasets
 import pandas as pd
 import json
+import os
 from pathlib import Path
 
-def explore_demo_datasets():
-    """Explore available demo datasets from Splink."""
+# CSV copies are only for manual inspection; downstream code reads Parquet
+WRITE_CSV = bool(os.getenv("EXPLORE_WRITE_CSV"))
+
+def load_fake_1000(data_dir=Path("data")):
+    """Load the fake_1000 dataset and save it locally as Parquet."""
     
     # Create data directory if it doesn't exist
-    data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
     
     # Load the fake_1000 dataset - synthetic person records
     print("Loading fake_1000 dataset...")
     df_fake = splink_datasets.fake_1000
     
+    # Save to Parquet for efficient loading
+    parquet_path = data_dir / "fake_1000.parquet"
+    df_fake.to_parquet(parquet_path, index=False, engine="pyarrow",
+                       compression="zstd", compression_level=3, row_group_size=50000)
+    print(f"Dataset saved to: {parquet_path}")
+    
+    return df_fake
+
+def explore_demo_datasets():
+    """Explore available demo datasets from Splink."""
+    
+    data_dir = Path("data")
+    df_fake = load_fake_1000(data_dir)
+    
     print(f"\nDataset shape: {df_fake.shape}")
     print(f"Columns: {df_fake.columns.tolist()}")
     print(f"\nFirst 5 records:")
@@ -35,14 +52,10 @@ def explore_demo_datasets():
     print(f"Total records: {len(df_fake)}")
     
     # Save to CSV for inspection
-    csv_path = data_dir / "fake_1000.csv"
-    df_fake.to_csv(csv_path, index=False)
-    print(f"\nDataset saved to: {csv_path}")
-    
-    # Save to Parquet for efficient loading
-    parquet_path = data_dir / "fake_1000.parquet"
-    df_fake.to_parquet(parquet_path, index=False)
-    print(f"Dataset saved to: {parquet_path}")
+    if WRITE_CSV:
+        csv_path = data_dir / "fake_1000.csv"
+        df_fake.to_csv(csv_path, index=False)
+        print(f"\nDataset saved to: {csv_path}")
     
     # Also explore historical_50k for a larger dataset
     print("\n" + "="*50)
@@ -55,9 +68,10 @@ def explore_demo_datasets():
     print(df_historical.head())
     
     # Save sample of historical dataset
-    sample_path = data_dir / "historical_50k_sample.csv"
-    df_historical.head(1000).to_csv(sample_path, index=False)
-    print(f"\nSample (1000 records) saved to: {sample_path}")
+    if WRITE_CSV:
+        sample_path = data_dir / "historical_50k_sample.csv"
+        df_historical.head(1000).to_csv(sample_path, index=False)
+        print(f"\nSample (1000 records) saved to: {sample_path}")
     
     return df_fake, df_historical
 
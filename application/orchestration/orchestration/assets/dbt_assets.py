@@ -1,5 +1,6 @@
 """dbt assets for transformation layer."""
 
+import os
 from pathlib import Path
 from dagster import AssetExecutionContext
 from dagster_dbt import DbtCliResource, dbt_assets
@@ -8,6 +9,10 @@ from dagster_dbt import DbtCliResource, dbt_assets
 DBT_PROJECT_PATH = Path(__file__).parent.parent.parent.parent / "transformation"
 DBT_PROFILES_PATH = DBT_PROJECT_PATH / "profiles.yml"
 
+# Optional override of the profile's thread count. dbt threads mostly wait
+# on Postgres, so the profile setting is used unless this is set explicitly.
+DBT_THREADS = os.getenv("DBT_THREADS")
+
 
 @dbt_assets(
     manifest=DBT_PROJECT_PATH / "target" / "manifest.json",
@@ -17,4 +22,7 @@ DBT_PROFILES_PATH = DBT_PROJECT_PATH / "profiles.yml"
 )
 def dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource):
     """Run dbt models."""
-    yield from dbt.cli(["build"], context=context).stream()
\ No newline at end of file
+    args = ["build"]
+    if DBT_THREADS:
+        args += ["--threads", str(int(DBT_THREADS))]
+    yield from dbt.cli(args, context=context).stream()
\ No newline at end of file
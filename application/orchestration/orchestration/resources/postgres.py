@@ -1,25 +1,111 @@
 """PostgreSQL resource configuration."""
 
 import os
+import threading
 from dagster import resource
 import psycopg2
+from psycopg2.extensions import connection as _connection
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+# Shared connection pool, created on first use so importing the
+# definitions does not require a running database
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PreparedStatementConnection(_connection):
+    """Connection that prepares named statements once per session.
+
+    Statements are prepared lazily on first use, so connections can be
+    opened before every referenced table exists.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        # Set once the connection has been returned to the pool for reuse
+        self.idle_in_pool = False
+
+    def execute_prepared(self, cursor, name, sql):
+        """Execute ``sql`` through the server-side prepared statement ``name``.
+
+        The first use on a session sends PREPARE and EXECUTE together, so it
+        costs the same single round trip as a plain query. Only reused
+        connections skip the parse and plan on later calls.
+        """
+        if name in self.prepared_statements:
+            cursor.execute(f"EXECUTE {name}")
+        else:
+            try:
+                cursor.execute(f"PREPARE {name} AS {sql}; EXECUTE {name}")
+            except psycopg2.Error:
+                # A rollback does not undo PREPARE, so after a failed EXECUTE
+                # the session may hold a statement we never recorded; close
+                # it so the pool discards the connection
+                self.close()
+                raise
+            self.prepared_statements.add(name)
+
+
+def _get_pool():
+    """Return the process-wide PostgreSQL connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            conn_params = {
+                "host": os.getenv("POSTGRES_HOST", "localhost"),
+                "port": int(os.getenv("POSTGRES_PORT", "5432")),
+                "database": os.getenv("POSTGRES_DB", "dataplatform"),
+                "user": os.getenv("POSTGRES_USER", "dataplatform"),
+                "password": os.getenv("POSTGRES_PASSWORD", "dataplatform"),
+            }
+            _pool = ThreadedConnectionPool(
+                minconn=1,
+                maxconn=int(os.getenv("POSTGRES_POOL_MAX_CONNECTIONS", "8")),
+                **conn_params,
+                connection_factory=PreparedStatementConnection,
+                cursor_factory=RealDictCursor,
+            )
+        return _pool
+
+
+def _getconn_alive(pool):
+    """Take a connection from the pool, discarding any that have gone stale."""
+    # There are at most maxconn idle connections to discard before the
+    # pool has to open a fresh one
+    for _ in range(pool.maxconn):
+        connection = pool.getconn()
+        try:
+            connection.autocommit = False
+            # Only connections that sat idle in the pool can have gone stale.
+            # The ping opens the transaction the caller goes on to use.
+            if connection.idle_in_pool:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            return connection
+        except psycopg2.Error:
+            pool.putconn(connection, close=True)
+    return pool.getconn()
 
 
 @resource
 def postgres_resource(context):
-    """PostgreSQL connection resource."""
-    conn_params = {
-        "host": os.getenv("POSTGRES_HOST", "localhost"),
-        "port": int(os.getenv("POSTGRES_PORT", "5432")),
-        "database": os.getenv("POSTGRES_DB", "dataplatform"),
-        "user": os.getenv("POSTGRES_USER", "dataplatform"),
-        "password": os.getenv("POSTGRES_PASSWORD", "dataplatform"),
-    }
-    
-    connection = psycopg2.connect(**conn_params, cursor_factory=RealDictCursor)
-    
+    """PostgreSQL connection resource backed by a shared connection pool."""
+    pool = _get_pool()
+    connection = _getconn_alive(pool)
+
     try:
         yield connection
     finally:
-        connection.close()
\ No newline at end of file
+        # Discard any uncommitted work before handing the connection back;
+        # if that fails the connection is broken and is closed instead
+        discard = bool(connection.closed)
+        try:
+            if not discard:
+                connection.rollback()
+        except psycopg2.Error:
+            discard = True
+        finally:
+            connection.idle_in_pool = not discard
+            pool.putconn(connection, close=discard)
@@ -2,10 +2,7 @@
 """
 Script to seed PostgreSQL with test data from Splink demo dataset
 """
-import csv
 import psycopg2
-from psycopg2.extras import execute_batch
-from datetime import datetime
 import os
 import sys
 
@@ -25,33 +22,41 @@ def load_splink_data(conn, csv_path):
     # Clear existing data
     cur.execute("TRUNCATE raw.person_records RESTART IDENTITY CASCADE;")
     
-    # Read CSV and prepare data
+    # Stage the raw CSV with COPY; trailing whitespace is cleaned up server-side
+    cur.execute("""
+        CREATE TEMP TABLE person_records_load (
+            unique_id TEXT,
+            first_name TEXT,
+            surname TEXT,
+            dob TEXT,
+            city TEXT,
+            email TEXT,
+            cluster TEXT
+        ) ON COMMIT DROP;
+    """)
+    
     with open(csv_path, 'r') as f:
-        reader = csv.DictReader(f)
-        records = []
-        
-        for row in reader:
-            # Handle empty values and date formatting
-            record = (
-                int(row['unique_id']),
-                row['first_name'].strip() if row['first_name'].strip() else None,
-                row['surname'].strip() if row['surname'].strip() else None,
-                row['dob'] if row['dob'] else None,
-                row['city'].strip() if row['city'].strip() else None,
-                row['email'].strip() if row['email'].strip() else None,
-                int(row['cluster']) if row['cluster'] else None
-            )
-            records.append(record)
+        cur.copy_expert(
+            "COPY person_records_load (unique_id, first_name, surname, dob, city, email, cluster) "
+            "FROM STDIN WITH (FORMAT CSV, HEADER TRUE, NULL '')",
+            f
+        )
     
-    # Insert data using batch execution for better performance
-    insert_query = """
+    # Move staged rows into the target table, converting blanks to NULL
+    cur.execute("""
         INSERT INTO raw.person_records 
         (unique_id, first_name, surname, dob, city, email, cluster)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        SELECT
+            unique_id::INTEGER,
+            NULLIF(TRIM(first_name), ''),
+            NULLIF(TRIM(surname), ''),
+            NULLIF(dob, '')::DATE,
+            NULLIF(TRIM(city), ''),
+            NULLIF(TRIM(email), ''),
+            NULLIF(cluster, '')::INTEGER
+        FROM person_records_load
         ON CONFLICT (unique_id) DO NOTHING;
-    """
-    
-    execute_batch(cur, insert_query, records, page_size=100)
+    """)
     conn.commit()
     
     # Get count of inserted records